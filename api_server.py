@@ -4,18 +4,31 @@ YOLO11 后端 API 服务
 """
 
 import io
-import base64
+import gzip
+import heapq
+import asyncio
+import os
+import threading
 import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+from itertools import repeat
+from operator import itemgetter
 from pathlib import Path
 from typing import Optional, List
 
 import cv2
 import numpy as np
+import orjson
+import pybase64
+import torch
 from PIL import Image
 from fastapi import FastAPI, File, UploadFile, HTTPException, Form, Body, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
+from starlette.datastructures import Headers, MutableHeaders
 import logging
 
 # 配置日志
@@ -23,6 +36,8 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 from ultralytics import YOLO
 
+from utils import KEYPOINT_NAMES
+
 
 # ==================== FastAPI 应用初始化 ====================
 app = FastAPI(
@@ -41,37 +56,88 @@ app.add_middleware(
 )
 
 
+class SmallResponseGZipMiddleware:
+    """
+    响应压缩中间件：只压缩体积适中的响应
+    
+    带 Base64 标注图像的响应体积大且几乎无法压缩，在事件循环中同步 gzip 会阻塞其他请求，
+    因此超过 maximum_size 的响应直接原样返回
+    """
+    
+    def __init__(self, app, minimum_size: int = 1024, maximum_size: int = 64 * 1024, compresslevel: int = 5):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.maximum_size = maximum_size
+        self.compresslevel = compresslevel
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or "gzip" not in Headers(scope=scope).get("accept-encoding", ""):
+            await self.app(scope, receive, send)
+            return
+        
+        start_message = None
+        
+        async def send_with_compression(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                # 先暂存响应头，拿到响应体后再决定是否压缩
+                start_message = {**message, "headers": list(message.get("headers", []))}
+                return
+            
+            if start_message is not None and message["type"] == "http.response.body":
+                body = message.get("body", b"")
+                headers = MutableHeaders(scope=start_message)
+                if (
+                    not message.get("more_body", False)
+                    and self.minimum_size <= len(body) <= self.maximum_size
+                    and "content-encoding" not in headers
+                ):
+                    body = gzip.compress(body, compresslevel=self.compresslevel)
+                    headers["Content-Encoding"] = "gzip"
+                    headers["Content-Length"] = str(len(body))
+                    headers.add_vary_header("Accept-Encoding")
+                    message = {**message, "body": body}
+                await send(start_message)
+                start_message = None
+            
+            await send(message)
+        
+        await self.app(scope, receive, send_with_compression)
+
+
+# 响应压缩（坐标数组等 JSON 结果在移动端网络下传输耗时明显）
+app.add_middleware(SmallResponseGZipMiddleware, minimum_size=1024, maximum_size=64 * 1024, compresslevel=5)
+
+
 # ==================== 请求体模型（用于 JSON 请求） ====================
-class DetectRequest(BaseModel):
-    """目标检测请求模型"""
+class ImageRequest(BaseModel):
+    """图像请求基础模型"""
     image_base64: str
     conf: float = 0.25
+
+
+class AnnotatedImageRequest(ImageRequest):
+    """可返回标注图像的请求基础模型（检测、姿态估计、分割共用）"""
     iou: float = 0.45
     return_image: bool = True
 
 
-class ClassifyRequest(BaseModel):
+class DetectRequest(AnnotatedImageRequest):
+    """目标检测请求模型"""
+
+
+class ClassifyRequest(ImageRequest):
     """图像分类请求模型"""
-    image_base64: str
-    conf: float = 0.25
     top_k: int = 5
     analyze_scene: bool = True  # 是否分析场景类型
 
 
-class PoseRequest(BaseModel):
+class PoseRequest(AnnotatedImageRequest):
     """姿态估计请求模型"""
-    image_base64: str
-    conf: float = 0.25
-    iou: float = 0.45
-    return_image: bool = True
 
 
-class SegmentRequest(BaseModel):
+class SegmentRequest(AnnotatedImageRequest):
     """实例分割请求模型"""
-    image_base64: str
-    conf: float = 0.25
-    iou: float = 0.45
-    return_image: bool = True
 
 
 # ==================== 模型管理 ====================
@@ -87,24 +153,116 @@ class ModelManager:
         'segment': 'yolo11n-seg.pt',
     }
     
+    # 推理精度：fp32 / fp16 / int8（默认 fp16，CPU 不支持半精度时自动保持 FP32）
+    PRECISIONS = ('fp32', 'fp16', 'int8')
+    PRECISION = os.environ.get('YOLO_PRECISION', 'fp16').strip().lower()
+    if PRECISION not in PRECISIONS:
+        raise ValueError(f"不支持的推理精度 YOLO_PRECISION={PRECISION}，可选值: {', '.join(PRECISIONS)}")
+    USE_HALF = PRECISION == 'fp16' and torch.cuda.is_available()
+    USE_INT8 = PRECISION == 'int8'
+    
+    # 实际生效的精度，写入导出文件名，切换精度后不会误用其他精度的导出文件
+    EXPORT_PRECISION = 'int8' if USE_INT8 else ('fp16' if USE_HALF else 'fp32')
+    
+    # 可选的推理引擎格式（如 engine / onnx / openvino），设置后首次加载时导出并复用导出文件
+    # INT8 需要导出量化模型，未指定格式时默认使用 OpenVINO
+    EXPORT_FORMAT = os.environ.get('YOLO_EXPORT_FORMAT', '').strip().lower() or ('openvino' if USE_INT8 else '')
+    
+    # 支持 INT8 量化导出的格式（ONNX 等格式会忽略 int8 参数，导出的仍是浮点模型）
+    INT8_EXPORT_FORMATS = ('openvino', 'engine')
+    if USE_INT8 and EXPORT_FORMAT not in INT8_EXPORT_FORMATS:
+        raise ValueError(
+            f"YOLO_EXPORT_FORMAT={EXPORT_FORMAT} 不支持 INT8 量化，"
+            f"YOLO_PRECISION=int8 时可选格式: {', '.join(INT8_EXPORT_FORMATS)}"
+        )
+    
+    # 同一个模型实例不支持多线程并发推理，每个任务使用独立的单线程推理线程池：
+    # 同一模型的请求依次排队，不同模型之间互不阻塞
+    _executors = {
+        task: ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"inference-{task}")
+        for task in MODEL_PATHS
+    }
+    
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
         return cls._instance
     
     def get_model(self, task: str) -> YOLO:
-        """获取指定任务的模型"""
-        if task not in self._models:
+        """获取指定任务的模型（只在该任务的推理线程中调用，首次调用时加载，无需加锁）"""
+        model = self._models.get(task)
+        if model is None:
             model_path = self.MODEL_PATHS.get(task)
             if model_path is None:
                 raise ValueError(f"不支持的任务类型: {task}")
+            model_path = self._resolve_model_path(task, model_path)
             print(f"正在加载模型: {model_path}")
-            self._models[task] = YOLO(model_path)
-        return self._models[task]
+            model = self._models[task] = YOLO(model_path, task=task)
+        return model
+    
+    def _resolve_model_path(self, task: str, model_path: str) -> str:
+        """按配置将 .pt 权重导出为推理引擎，返回实际需要加载的模型路径"""
+        if not self.EXPORT_FORMAT:
+            return model_path
+        
+        export_path = self._export_path(model_path)
+        if export_path.exists():
+            return str(export_path)
+        
+        # INT8 量化使用 Ultralytics 为各任务内置的小型校准数据集
+        print(f"正在导出模型: {model_path} -> {export_path}")
+        exported = Path(YOLO(model_path, task=task).export(
+            format=self.EXPORT_FORMAT, half=self.USE_HALF, int8=self.USE_INT8
+        ))
+        if exported != export_path:
+            exported.rename(export_path)
+        return str(export_path)
+    
+    def _export_path(self, model_path: str) -> Path:
+        """导出模型的保存路径（文件名包含精度，不同精度的导出文件互不混用）"""
+        path = Path(model_path)
+        stem = f"{path.stem}_{self.EXPORT_PRECISION}"
+        if self.EXPORT_FORMAT == 'openvino':
+            return path.with_name(f"{stem}_openvino_model")
+        return path.with_name(f"{stem}.{self.EXPORT_FORMAT}")
+    
+    def submit(self, task: str, image: np.ndarray, **kwargs) -> Future:
+        """将推理提交到该任务专属的推理线程，返回 Future（同一模型的推理串行执行）"""
+        executor = self._executors.get(task)
+        if executor is None:
+            raise ValueError(f"不支持的任务类型: {task}")
+        return executor.submit(self._predict, task, image, **kwargs)
+    
+    def _predict(self, task: str, image: np.ndarray, **kwargs):
+        """使用指定任务的模型执行推理（只能在该任务的推理线程中调用）"""
+        model = self.get_model(task)
+        kwargs.setdefault('half', self.USE_HALF)
+        return model(image, **kwargs)
+    
+    def warmup(self):
+        """预加载所有模型并执行一次空推理，提前完成权重加载和内核初始化"""
+        if torch.cuda.is_available():
+            # 让 cuDNN 为实际输入尺寸选择最快的卷积算法（每种尺寸只在首次出现时测试一次）
+            torch.backends.cudnn.benchmark = True
+        
+        dummy = np.zeros((640, 640, 3), dtype=np.uint8)
+        futures = [self.submit(task, dummy, verbose=False) for task in self.MODEL_PATHS]
+        for future in futures:
+            future.result()
 
 
 model_manager = ModelManager()
 
+def submit_inference(task: str, image: np.ndarray, **kwargs) -> asyncio.Future:
+    """将模型推理提交到对应任务的推理线程，返回可 await 的 Future（提交后立即开始执行）"""
+    return asyncio.wrap_future(model_manager.submit(task, image, **kwargs))
+
+
+@app.on_event("startup")
+async def warmup_models():
+    """服务启动时预热模型，避免首个请求承担冷启动延迟"""
+    await asyncio.to_thread(model_manager.warmup)
+
 
 # ==================== 场景分类映射 ====================
 class SceneAnalyzer:
@@ -186,6 +344,12 @@ class SceneAnalyzer:
         }
     }
     
+    # 场景分布中不随请求变化的字段
+    _SCENE_META = {
+        scene: {"type": scene, "name": info["name"], "icon": info["icon"]}
+        for scene, info in SCENE_TYPES.items()
+    }
+    
     # 图像特征分析阈值
     COLOR_THRESHOLDS = {
         "anime_saturation": 0.6,  # 动漫通常色彩饱和度高
@@ -199,28 +363,33 @@ class SceneAnalyzer:
         
         # 转换到HSV颜色空间
         hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+        pixel_count = hsv.shape[0] * hsv.shape[1]
+        
+        # 一次遍历同时得到 H/S/V 三个通道的均值
+        _, s_mean, v_mean, _ = cv2.mean(hsv)
         
         # 计算饱和度均值（动漫图片通常饱和度较高）
-        saturation = hsv[:, :, 1].mean() / 255.0
+        saturation = s_mean / 255.0
         features["saturation"] = saturation
         
-        # 计算颜色丰富度（通过直方图）
+        # 计算颜色丰富度（通过直方图，占比超过 1% 的色调数）
         hist_h = cv2.calcHist([hsv], [0], None, [180], [0, 180])
-        hist_h = hist_h / hist_h.sum()  # 归一化
-        color_variety = (hist_h > 0.01).sum() / 180.0
+        color_variety = (hist_h > 0.01 * pixel_count).sum() / 180.0
         features["color_variety"] = float(color_variety)
         
         # 边缘检测（动漫图片边缘通常更清晰）
         gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
         edges = cv2.Canny(gray, 100, 200)
-        edge_ratio = edges.mean() / 255.0
+        edge_ratio = cv2.countNonZero(edges) / edges.size
         features["edge_ratio"] = edge_ratio
         
         # 颜色数量（动漫图片颜色数量相对较少但边界清晰）
         # 简化颜色
         small = cv2.resize(image, (64, 64))
-        small = (small // 32) * 32  # 量化颜色
-        unique_colors = len(np.unique(small.reshape(-1, 3), axis=0))
+        # 每个通道量化为 8 级后打包成 9 位颜色编号（共 512 种），用计数代替排序去重
+        small = (small >> 5).astype(np.uint16)
+        packed = small[:, :, 0] | (small[:, :, 1] << 3) | (small[:, :, 2] << 6)
+        unique_colors = int(np.count_nonzero(np.bincount(packed.ravel(), minlength=512)))
         features["unique_colors"] = unique_colors
         
         # 判断是否可能是动漫/卡通风格
@@ -232,13 +401,36 @@ class SceneAnalyzer:
         features["is_anime_style"] = bool(is_anime_style)  # 转换为 Python 原生 bool
         
         # 计算亮度（用于判断室内外）
-        brightness = hsv[:, :, 2].mean() / 255.0
+        brightness = v_mean / 255.0
         features["brightness"] = float(brightness)  # 转换为 Python 原生 float
         features["saturation"] = float(saturation)  # 确保是 Python 原生 float
         features["edge_ratio"] = float(edge_ratio)  # 确保是 Python 原生 float
         
         return features
     
+    # 模型输出的类别名是有限集合，关键词匹配结果按类别名缓存，避免每次请求遍历全部场景关键词
+    @classmethod
+    @lru_cache(maxsize=2048)
+    def _match_class_keywords(cls, class_name: str) -> tuple:
+        """返回与分类类别名互相包含的 (场景类型, 关键词) 列表"""
+        return tuple(
+            (scene_type, keyword)
+            for scene_type, scene_info in cls.SCENE_TYPES.items()
+            for keyword in scene_info["keywords"]
+            if keyword in class_name or class_name in keyword
+        )
+    
+    @classmethod
+    @lru_cache(maxsize=2048)
+    def _match_object_keywords(cls, obj_name: str) -> tuple:
+        """返回检测对象名中包含的每个关键词所属的场景类型"""
+        return tuple(
+            scene_type
+            for scene_type, scene_info in cls.SCENE_TYPES.items()
+            for keyword in scene_info["keywords"]
+            if keyword in obj_name
+        )
+    
     @classmethod
     def classify_scene(cls, classifications: list, image_features: dict = None, detected_objects: list = None) -> dict:
         """根据分类结果推断场景类型"""
@@ -251,16 +443,15 @@ class SceneAnalyzer:
             class_name = item["class_name"].lower()
             confidence = item["confidence"]
             
-            for scene_type, scene_info in cls.SCENE_TYPES.items():
-                for keyword in scene_info["keywords"]:
-                    if keyword in class_name or class_name in keyword:
-                        scene_scores[scene_type] += confidence
-                        matched_keywords.append({
-                            "keyword": keyword,
-                            "class": class_name,
-                            "scene": scene_type,
-                            "confidence": confidence
-                        })
+            for scene_type, keyword in cls._match_class_keywords(class_name):
+                scene_scores[scene_type] += confidence
+                if len(matched_keywords) < 10:  # 最多返回10个匹配关键词
+                    matched_keywords.append({
+                        "keyword": keyword,
+                        "class": class_name,
+                        "scene": scene_type,
+                        "confidence": confidence
+                    })
         
         # 分析检测到的对象（如果有）
         if detected_objects:
@@ -272,10 +463,8 @@ class SceneAnalyzer:
                 if obj_name == "person":
                     scene_scores["portrait"] += obj_conf * 1.5
                 
-                for scene_type, scene_info in cls.SCENE_TYPES.items():
-                    for keyword in scene_info["keywords"]:
-                        if keyword in obj_name:
-                            scene_scores[scene_type] += obj_conf * 0.8
+                for scene_type in cls._match_object_keywords(obj_name):
+                    scene_scores[scene_type] += obj_conf * 0.8
         
         # 图像特征分析加成
         if image_features:
@@ -301,15 +490,10 @@ class SceneAnalyzer:
         # 计算所有场景的置信度分布
         total_score = sum(scene_scores.values()) + 0.001  # 避免除零
         scene_distribution = [
-            {
-                "type": scene,
-                "name": cls.SCENE_TYPES[scene]["name"],
-                "icon": cls.SCENE_TYPES[scene]["icon"],
-                "confidence": score / total_score
-            }
-            for scene, score in sorted(scene_scores.items(), key=lambda x: -x[1])
+            {**cls._SCENE_META[scene], "confidence": score / total_score}
+            for scene, score in heapq.nlargest(5, scene_scores.items(), key=itemgetter(1))  # 只返回前5个
             if score > 0
-        ][:5]  # 只返回前5个
+        ]
         
         return {
             "primary_scene": {
@@ -320,7 +504,7 @@ class SceneAnalyzer:
                 "confidence": min(best_score, 1.0)
             },
             "scene_distribution": scene_distribution,
-            "matched_keywords": matched_keywords[:10],  # 最多返回10个匹配关键词
+            "matched_keywords": matched_keywords,
             "image_features": {
                 "is_anime_style": bool(image_features.get("is_anime_style", False)) if image_features else False,
                 "saturation": float(round(image_features.get("saturation", 0), 2)) if image_features else 0.0,
@@ -331,6 +515,9 @@ class SceneAnalyzer:
 
 scene_analyzer = SceneAnalyzer()
 
+# 图像特征分析线程池（OpenCV 运算会释放 GIL，可与模型推理并行）
+_feature_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="scene-features")
+
 
 # ==================== 响应模型 ====================
 class BBox(BaseModel):
@@ -384,68 +571,175 @@ def read_image_from_upload(file: UploadFile) -> np.ndarray:
     return image
 
 
+class DecodedImageCache:
+    """
+    解码图像 LRU 缓存
+    
+    客户端重试、页面刷新等场景会重复提交同一张图像，命中缓存时跳过 Base64 和 JPEG 解码。
+    缓存中的图像设为只读，调用方如需修改必须先复制。
+    """
+    
+    def __init__(self, max_entries: int = 16, max_bytes: int = 256 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._images = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def make_key(base64_str: str) -> tuple:
+        """以长度和字符串哈希作为缓存键，不额外保留原始字符串"""
+        return len(base64_str), hash(base64_str)
+    
+    def get(self, key: tuple) -> Optional[np.ndarray]:
+        with self._lock:
+            image = self._images.get(key)
+            if image is not None:
+                self._images.move_to_end(key)
+            return image
+    
+    def put(self, key: tuple, image: np.ndarray) -> None:
+        # 无论是否放得进缓存都设为只读，保证调用方拿到的图像行为一致
+        image.flags.writeable = False
+        if image.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._images:
+                return
+            self._images[key] = image
+            self._total_bytes += image.nbytes
+            while len(self._images) > self.max_entries or self._total_bytes > self.max_bytes:
+                _, evicted = self._images.popitem(last=False)
+                self._total_bytes -= evicted.nbytes
+
+
+decoded_image_cache = DecodedImageCache()
+
+
 def read_image_from_base64(base64_str: str) -> np.ndarray:
-    """从 Base64 字符串读取图像"""
+    """从 Base64 字符串读取图像（返回的图像为只读）"""
     try:
         if not base64_str or len(base64_str) < 100:
             raise HTTPException(status_code=400, detail=f"Base64 数据太短或为空，长度: {len(base64_str) if base64_str else 0}")
         
-        logger.info(f"接收到 Base64 数据，长度: {len(base64_str)}")
+        logger.debug("接收到 Base64 数据，长度: %d", len(base64_str))
         
-        # 移除可能的 data URL 前缀
-        if ',' in base64_str:
-            base64_str = base64_str.split(',')[1]
+        # 移除可能的 data URL 前缀（前缀只会出现在开头，无需扫描整个字符串）
+        comma_idx = base64_str.find(',', 0, 128)
+        if comma_idx >= 0:
+            base64_str = base64_str[comma_idx + 1:]
         
-        # 移除可能的空白字符
-        base64_str = base64_str.strip()
+        cache_key = decoded_image_cache.make_key(base64_str)
+        image = decoded_image_cache.get(cache_key)
+        if image is not None:
+            logger.debug("命中图像解码缓存，图像尺寸: %s", image.shape)
+            return image
         
-        image_bytes = base64.b64decode(base64_str)
-        logger.info(f"解码后图像字节数: {len(image_bytes)}")
+        # 非严格模式解码会跳过空白等非 Base64 字符，无需再 strip
+        image_bytes = pybase64.b64decode(base64_str, validate=False)
+        logger.debug("解码后图像字节数: %d", len(image_bytes))
         
         nparr = np.frombuffer(image_bytes, np.uint8)
         image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
         if image is None:
             raise HTTPException(status_code=400, detail="无法解析 Base64 图像，可能是格式不支持")
         
-        logger.info(f"图像尺寸: {image.shape}")
+        logger.debug("图像尺寸: %s", image.shape)
+        decoded_image_cache.put(cache_key, image)
         return image
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Base64 解码失败: {str(e)}")
+        logger.error("Base64 解码失败: %s", e)
         raise HTTPException(status_code=400, detail=f"Base64 解码失败: {str(e)}")
 
 
+def parse_detection_boxes(result) -> list:
+    """解析单个结果中的检测框（整批取回 CPU，避免逐框同步）"""
+    boxes = result.boxes
+    if boxes is None:
+        return []
+    
+    xyxy = boxes.xyxy.cpu().numpy().tolist()
+    class_ids = boxes.cls.cpu().numpy().astype(int).tolist()
+    confidences = boxes.conf.cpu().numpy().tolist()
+    names = result.names
+    
+    return [
+        {
+            "class_id": class_id,
+            "class_name": names[class_id],
+            "confidence": confidence,
+            "bbox": {"x1": x1, "y1": y1, "x2": x2, "y2": y2}
+        }
+        for (x1, y1, x2, y2), class_id, confidence in zip(xyxy, class_ids, confidences)
+    ]
+
+
 def encode_image_to_base64(image: np.ndarray, format: str = 'jpg') -> str:
     """将图像编码为 Base64"""
     if format == 'jpg':
         _, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 85])
     else:
         _, buffer = cv2.imencode('.png', image)
-    return base64.b64encode(buffer).decode('utf-8')
+    return pybase64.b64encode(buffer).decode('ascii')  # Base64 输出只含 ASCII 字符
+
+
+def render_annotated_image(result) -> str:
+    """绘制检测结果并编码为 Base64"""
+    return encode_image_to_base64(result.plot())
+
+
+async def collect_pending(*futures) -> None:
+    """
+    回收请求中提交的并行任务
+    
+    请求失败时这些任务可能尚未完成：未开始的直接取消，并收集所有异常，
+    避免 "Future exception was never retrieved"
+    """
+    pending = [future for future in futures if future is not None]
+    for future in pending:
+        future.cancel()
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
 
 
 # ==================== API 路由 ====================
 
+def _dumps_json(content: dict) -> bytes:
+    """序列化响应体（orjson 输出紧凑的 UTF-8 JSON，并支持 numpy 标量）"""
+    return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+def _json_response(content: dict) -> Response:
+    """使用 orjson 构建 JSON 响应，比标准库 json 序列化浮点数组快得多"""
+    return Response(content=_dumps_json(content), media_type="application/json")
+
+
+# 根路由和健康检查的内容固定不变，启动时序列化一次，请求时直接返回字节
+_ROOT_BODY = _dumps_json({
+    "name": "YOLO11 视觉识别 API",
+    "version": "1.0.0",
+    "endpoints": {
+        "detect": "/api/detect",
+        "classify": "/api/classify",
+        "pose": "/api/pose",
+        "segment": "/api/segment"
+    }
+})
+_HEALTH_BODY = _dumps_json({"status": "healthy", "message": "服务运行正常"})
+
+
 @app.get("/")
 async def root():
     """API 根路由"""
-    return {
-        "name": "YOLO11 视觉识别 API",
-        "version": "1.0.0",
-        "endpoints": {
-            "detect": "/api/detect",
-            "classify": "/api/classify",
-            "pose": "/api/pose",
-            "segment": "/api/segment"
-        }
-    }
+    return Response(content=_ROOT_BODY, media_type="application/json")
 
 
 @app.get("/api/health")
 async def health_check():
     """健康检查"""
-    return {"status": "healthy", "message": "服务运行正常"}
+    return Response(content=_HEALTH_BODY, media_type="application/json")
 
 
 # ==================== 目标检测 API ====================
@@ -459,34 +753,24 @@ async def detect_objects(request: DetectRequest):
     - iou: IoU 阈值
     - return_image: 是否返回标注后的图像
     """
+    annotated_future = None
     try:
-        logger.info(f"[Detect] 收到 JSON 请求，数据长度: {len(request.image_base64)}")
+        logger.info("[Detect] 收到 JSON 请求，数据长度: %d", len(request.image_base64))
         
-        # 读取图像
-        image = read_image_from_base64(request.image_base64)
+        # 读取图像（Base64 解码和 imdecode 放到线程中执行，避免阻塞事件循环）
+        image = await asyncio.to_thread(read_image_from_base64, request.image_base64)
         
         # 执行检测
-        model = model_manager.get_model('detect')
-        results = model(image, conf=request.conf, iou=request.iou)
+        results = await submit_inference('detect', image, conf=request.conf, iou=request.iou)
+        
+        # 标注图像的绘制和编码较耗时，提交到线程中与结果解析并行执行
+        if request.return_image:
+            annotated_future = asyncio.get_running_loop().run_in_executor(None, render_annotated_image, results[0])
         
         # 解析结果
         detections = []
         for result in results:
-            boxes = result.boxes
-            if boxes is not None:
-                for box in boxes:
-                    x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                    detections.append({
-                        "class_id": int(box.cls[0]),
-                        "class_name": result.names[int(box.cls[0])],
-                        "confidence": float(box.conf[0]),
-                        "bbox": {
-                            "x1": float(x1),
-                            "y1": float(y1),
-                            "x2": float(x2),
-                            "y2": float(y2)
-                        }
-                    })
+            detections.extend(parse_detection_boxes(result))
         
         response_data = {
             "success": True,
@@ -499,17 +783,18 @@ async def detect_objects(request: DetectRequest):
         }
         
         # 返回标注图像
-        if request.return_image:
-            annotated = results[0].plot()
-            response_data["data"]["annotated_image"] = encode_image_to_base64(annotated)
+        if annotated_future is not None:
+            response_data["data"]["annotated_image"] = await annotated_future
         
-        return JSONResponse(content=response_data)
+        return _json_response(response_data)
     
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"[Detect] 错误: {str(e)}")
+        logger.error("[Detect] 错误: %s", e)
         raise HTTPException(status_code=500, detail=f"检测失败: {str(e)}")
+    finally:
+        await collect_pending(annotated_future)
 
 
 # ==================== 图像分类 API ====================
@@ -523,15 +808,24 @@ async def classify_image(request: ClassifyRequest):
     - top_k: 返回前 k 个分类结果
     - analyze_scene: 是否分析场景类型（默认开启）
     """
+    features_future = None
+    detect_future = None
     try:
-        logger.info(f"[Classify] 收到 JSON 请求，场景分析: {request.analyze_scene}")
+        logger.info("[Classify] 收到 JSON 请求，场景分析: %s", request.analyze_scene)
         
-        # 读取图像
-        image = read_image_from_base64(request.image_base64)
+        # 读取图像（Base64 解码和 imdecode 放到线程中执行，避免阻塞事件循环）
+        image = await asyncio.to_thread(read_image_from_base64, request.image_base64)
+        
+        # 图像特征分析、分类推理和辅助检测推理互不依赖，全部提交到线程中并行执行
+        loop = asyncio.get_running_loop()
+        if request.analyze_scene:
+            features_future = loop.run_in_executor(
+                _feature_executor, scene_analyzer.analyze_image_features, image
+            )
+            detect_future = submit_inference('detect', image, conf=0.3)
         
         # 执行分类
-        model = model_manager.get_model('classify')
-        results = model(image, conf=request.conf)
+        results = await submit_inference('classify', image, conf=request.conf)
         
         # 解析分类结果
         classifications = []
@@ -564,23 +858,29 @@ async def classify_image(request: ClassifyRequest):
         
         # 场景分析
         if request.analyze_scene:
-            # 分析图像特征
-            image_features = scene_analyzer.analyze_image_features(image)
-            
             # 尝试获取目标检测结果以辅助场景判断
             detected_objects = []
             try:
-                detect_model = model_manager.get_model('detect')
-                detect_results = detect_model(image, conf=0.3)
+                detect_results = await detect_future
                 for det_result in detect_results:
-                    if det_result.boxes is not None:
-                        for box in det_result.boxes:
+                    boxes = det_result.boxes
+                    if boxes is not None:
+                        class_ids = boxes.cls.cpu().numpy().astype(int).tolist()
+                        confidences = boxes.conf.cpu().numpy().tolist()
+                        for class_id, confidence in zip(class_ids, confidences):
                             detected_objects.append({
-                                "class_name": det_result.names[int(box.cls[0])],
-                                "confidence": float(box.conf[0])
+                                "class_name": det_result.names[class_id],
+                                "confidence": confidence
                             })
             except Exception as e:
-                logger.warning(f"目标检测辅助分析失败: {e}")
+                logger.warning("目标检测辅助分析失败: %s", e)
+            
+            # 等待图像特征分析结果（失败时不使用图像特征继续分析）
+            image_features = None
+            try:
+                image_features = await features_future
+            except Exception as e:
+                logger.warning("图像特征分析失败: %s", e)
             
             # 进行场景分析
             scene_analysis = scene_analyzer.classify_scene(
@@ -593,13 +893,15 @@ async def classify_image(request: ClassifyRequest):
             response_data["data"]["detected_objects"] = detected_objects[:10]  # 最多返回10个检测对象
             response_data["message"] = f"分类完成：{scene_analysis['primary_scene']['name']}"
         
-        return JSONResponse(content=response_data)
+        return _json_response(response_data)
     
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"[Classify] 错误: {str(e)}")
+        logger.error("[Classify] 错误: %s", e)
         raise HTTPException(status_code=500, detail=f"分类失败: {str(e)}")
+    finally:
+        await collect_pending(features_future, detect_future)
 
 
 # ==================== 常用类别中文翻译 ====================
@@ -630,8 +932,9 @@ CLASS_NAME_TRANSLATIONS = {
 }
 
 
+@lru_cache(maxsize=1024)
 def translate_class_name(english_name: str) -> str:
-    """将英文类名翻译为中文"""
+    """将英文类名翻译为中文（类名集合固定，结果缓存）"""
     name_lower = english_name.lower().replace("_", " ")
     
     # 直接匹配
@@ -657,23 +960,19 @@ async def estimate_pose(request: PoseRequest):
     - iou: IoU 阈值
     - return_image: 是否返回标注后的图像
     """
+    annotated_future = None
     try:
-        logger.info(f"[Pose] 收到 JSON 请求")
+        logger.info("[Pose] 收到 JSON 请求")
         
-        # 读取图像
-        image = read_image_from_base64(request.image_base64)
+        # 读取图像（Base64 解码和 imdecode 放到线程中执行，避免阻塞事件循环）
+        image = await asyncio.to_thread(read_image_from_base64, request.image_base64)
         
         # 执行姿态估计
-        model = model_manager.get_model('pose')
-        results = model(image, conf=request.conf, iou=request.iou)
-        
-        # 关键点名称
-        keypoint_names = [
-            'nose', 'left_eye', 'right_eye', 'left_ear', 'right_ear',
-            'left_shoulder', 'right_shoulder', 'left_elbow', 'right_elbow',
-            'left_wrist', 'right_wrist', 'left_hip', 'right_hip',
-            'left_knee', 'right_knee', 'left_ankle', 'right_ankle'
-        ]
+        results = await submit_inference('pose', image, conf=request.conf, iou=request.iou)
+        
+        # 标注图像的绘制和编码较耗时，提交到线程中与结果解析并行执行
+        if request.return_image:
+            annotated_future = asyncio.get_running_loop().run_in_executor(None, render_annotated_image, results[0])
         
         # 解析结果
         poses = []
@@ -682,31 +981,25 @@ async def estimate_pose(request: PoseRequest):
                 keypoints_data = result.keypoints
                 boxes = result.boxes
                 
-                for i in range(len(keypoints_data)):
-                    kpts = keypoints_data[i].xy[0].cpu().numpy()
-                    kpts_conf = keypoints_data[i].conf[0].cpu().numpy() if keypoints_data[i].conf is not None else None
+                # 每个结果只做一次 GPU→CPU 传输，再按人索引
+                all_kpts = keypoints_data.xy.cpu().numpy().tolist()
+                all_kpts_conf = keypoints_data.conf.cpu().numpy().tolist() if keypoints_data.conf is not None else None
+                all_boxes = boxes.xyxy.cpu().numpy().tolist() if boxes is not None else []
+                
+                for i, kpts in enumerate(all_kpts):
+                    kpts_conf = all_kpts_conf[i] if all_kpts_conf is not None else repeat(0.0)
                     
                     # 获取边界框
                     bbox = None
-                    if boxes is not None and i < len(boxes):
-                        x1, y1, x2, y2 = boxes[i].xyxy[0].cpu().numpy()
-                        bbox = {
-                            "x1": float(x1),
-                            "y1": float(y1),
-                            "x2": float(x2),
-                            "y2": float(y2)
-                        }
+                    if i < len(all_boxes):
+                        x1, y1, x2, y2 = all_boxes[i]
+                        bbox = {"x1": x1, "y1": y1, "x2": x2, "y2": y2}
                     
                     # 构建关键点信息
-                    keypoints = []
-                    for j, name in enumerate(keypoint_names):
-                        if j < len(kpts):
-                            keypoints.append({
-                                "name": name,
-                                "x": float(kpts[j][0]),
-                                "y": float(kpts[j][1]),
-                                "confidence": float(kpts_conf[j]) if kpts_conf is not None else 0.0
-                            })
+                    keypoints = [
+                        {"name": name, "x": x, "y": y, "confidence": confidence}
+                        for name, (x, y), confidence in zip(KEYPOINT_NAMES, kpts, kpts_conf)
+                    ]
                     
                     poses.append({
                         "person_id": i,
@@ -725,17 +1018,18 @@ async def estimate_pose(request: PoseRequest):
         }
         
         # 返回标注图像
-        if request.return_image:
-            annotated = results[0].plot()
-            response_data["data"]["annotated_image"] = encode_image_to_base64(annotated)
+        if annotated_future is not None:
+            response_data["data"]["annotated_image"] = await annotated_future
         
-        return JSONResponse(content=response_data)
+        return _json_response(response_data)
     
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"[Pose] 错误: {str(e)}")
+        logger.error("[Pose] 错误: %s", e)
         raise HTTPException(status_code=500, detail=f"姿态估计失败: {str(e)}")
+    finally:
+        await collect_pending(annotated_future)
 
 
 # ==================== 实例分割 API ====================
@@ -749,37 +1043,24 @@ async def segment_image(request: SegmentRequest):
     - iou: IoU 阈值
     - return_image: 是否返回标注后的图像
     """
+    annotated_future = None
     try:
-        logger.info(f"[Segment] 收到 JSON 请求")
+        logger.info("[Segment] 收到 JSON 请求")
         
-        # 读取图像
-        image = read_image_from_base64(request.image_base64)
+        # 读取图像（Base64 解码和 imdecode 放到线程中执行，避免阻塞事件循环）
+        image = await asyncio.to_thread(read_image_from_base64, request.image_base64)
         
         # 执行分割
-        model = model_manager.get_model('segment')
-        results = model(image, conf=request.conf, iou=request.iou)
+        results = await submit_inference('segment', image, conf=request.conf, iou=request.iou)
+        
+        # 标注图像的绘制和编码较耗时，提交到线程中与结果解析并行执行
+        if request.return_image:
+            annotated_future = asyncio.get_running_loop().run_in_executor(None, render_annotated_image, results[0])
         
         # 解析结果
         segments = []
         for result in results:
-            boxes = result.boxes
-            masks = result.masks
-            
-            if boxes is not None:
-                for i, box in enumerate(boxes):
-                    x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                    segment_data = {
-                        "class_id": int(box.cls[0]),
-                        "class_name": result.names[int(box.cls[0])],
-                        "confidence": float(box.conf[0]),
-                        "bbox": {
-                            "x1": float(x1),
-                            "y1": float(y1),
-                            "x2": float(x2),
-                            "y2": float(y2)
-                        }
-                    }
-                    segments.append(segment_data)
+            segments.extend(parse_detection_boxes(result))
         
         response_data = {
             "success": True,
@@ -792,17 +1073,18 @@ async def segment_image(request: SegmentRequest):
         }
         
         # 返回标注图像
-        if request.return_image:
-            annotated = results[0].plot()
-            response_data["data"]["annotated_image"] = encode_image_to_base64(annotated)
+        if annotated_future is not None:
+            response_data["data"]["annotated_image"] = await annotated_future
         
-        return JSONResponse(content=response_data)
+        return _json_response(response_data)
     
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"[Segment] 错误: {str(e)}")
+        logger.error("[Segment] 错误: %s", e)
         raise HTTPException(status_code=500, detail=f"分割失败: {str(e)}")
+    finally:
+        await collect_pending(annotated_future)
 
 
 # ==================== 启动服务 ====================
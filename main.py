@@ -5,10 +5,14 @@ YOLO11 多功能视觉识别项目
 
 import cv2
 import numpy as np
+from itertools import repeat
 from pathlib import Path
+from PIL import Image
 from ultralytics import YOLO
 from typing import Optional, Union, List
 
+from utils import KEYPOINT_NAMES
+
 
 class YOLO11Vision:
     """YOLO11 多功能视觉识别类"""
@@ -41,6 +45,81 @@ class YOLO11Vision:
             self.models[task] = YOLO(model_path)
         return self.models[task]
     
+    # ==================== 结果解析 ====================
+    @staticmethod
+    def _parse_classification(result, top_k: int) -> List[dict]:
+        """解析单张图像的分类结果"""
+        classifications = []
+        probs = result.probs
+        if probs is not None:
+            # 获取 top_k 个分类结果
+            top_indices = probs.top5[:top_k] if hasattr(probs, 'top5') else []
+            top_confs = probs.top5conf[:top_k] if hasattr(probs, 'top5conf') else []
+            
+            for idx, conf_score in zip(top_indices, top_confs):
+                class_name = result.names[idx]
+                classifications.append({
+                    'class_id': int(idx),
+                    'class_name': class_name,
+                    'confidence': float(conf_score)
+                })
+        return classifications
+    
+    @staticmethod
+    def _parse_detection(result) -> List[dict]:
+        """解析单张图像的检测结果"""
+        detections = []
+        boxes = result.boxes
+        if boxes is not None:
+            # 整批取回 CPU，避免逐框同步
+            xyxy = boxes.xyxy.cpu().numpy().tolist()
+            class_ids = boxes.cls.cpu().numpy().astype(int).tolist()
+            confidences = boxes.conf.cpu().numpy().tolist()
+            
+            for (x1, y1, x2, y2), class_id, confidence in zip(xyxy, class_ids, confidences):
+                detections.append({
+                    'class_id': class_id,
+                    'class_name': result.names[class_id],
+                    'confidence': confidence,
+                    'bbox': {'x1': x1, 'y1': y1, 'x2': x2, 'y2': y2}
+                })
+        return detections
+    
+    @staticmethod
+    def _parse_pose(result) -> List[dict]:
+        """解析单张图像的姿态估计结果"""
+        poses = []
+        if result.keypoints is not None:
+            keypoints_data = result.keypoints
+            boxes = result.boxes
+            
+            # 每个结果只做一次 GPU→CPU 传输，再按人索引
+            all_kpts = keypoints_data.xy.cpu().numpy().tolist()
+            all_kpts_conf = keypoints_data.conf.cpu().numpy().tolist() if keypoints_data.conf is not None else None
+            all_boxes = boxes.xyxy.cpu().numpy().tolist() if boxes is not None else []
+            
+            for i, kpts in enumerate(all_kpts):
+                kpts_conf = all_kpts_conf[i] if all_kpts_conf is not None else repeat(0.0)
+                
+                # 获取边界框
+                bbox = None
+                if i < len(all_boxes):
+                    x1, y1, x2, y2 = all_boxes[i]
+                    bbox = {'x1': x1, 'y1': y1, 'x2': x2, 'y2': y2}
+                
+                # 构建关键点信息
+                keypoints = [
+                    {'name': name, 'x': x, 'y': y, 'confidence': confidence}
+                    for name, (x, y), confidence in zip(KEYPOINT_NAMES, kpts, kpts_conf)
+                ]
+                
+                poses.append({
+                    'person_id': i,
+                    'bbox': bbox,
+                    'keypoints': keypoints
+                })
+        return poses
+    
     # ==================== 图像分类 ====================
     def classify_image(
         self, 
@@ -68,19 +147,7 @@ class YOLO11Vision:
         
         classifications = []
         for result in results:
-            probs = result.probs
-            if probs is not None:
-                # 获取 top_k 个分类结果
-                top_indices = probs.top5[:top_k] if hasattr(probs, 'top5') else []
-                top_confs = probs.top5conf[:top_k] if hasattr(probs, 'top5conf') else []
-                
-                for idx, conf_score in zip(top_indices, top_confs):
-                    class_name = result.names[idx]
-                    classifications.append({
-                        'class_id': int(idx),
-                        'class_name': class_name,
-                        'confidence': float(conf_score)
-                    })
+            classifications.extend(self._parse_classification(result, top_k))
         
         return {
             'task': 'classification',
@@ -116,21 +183,7 @@ class YOLO11Vision:
         
         detections = []
         for result in results:
-            boxes = result.boxes
-            if boxes is not None:
-                for box in boxes:
-                    x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                    detections.append({
-                        'class_id': int(box.cls[0]),
-                        'class_name': result.names[int(box.cls[0])],
-                        'confidence': float(box.conf[0]),
-                        'bbox': {
-                            'x1': float(x1),
-                            'y1': float(y1),
-                            'x2': float(x2),
-                            'y2': float(y2)
-                        }
-                    })
+            detections.extend(self._parse_detection(result))
         
         return {
             'task': 'detection',
@@ -179,20 +232,19 @@ class YOLO11Vision:
         for result in results:
             boxes = result.boxes
             if boxes is not None and boxes.id is not None:
-                for i, box in enumerate(boxes):
-                    track_id = int(boxes.id[i]) if boxes.id is not None else -1
-                    x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
+                # 整批取回 CPU，避免逐框同步
+                track_ids = boxes.id.cpu().numpy().astype(int).tolist()
+                xyxy = boxes.xyxy.cpu().numpy().tolist()
+                class_ids = boxes.cls.cpu().numpy().astype(int).tolist()
+                confidences = boxes.conf.cpu().numpy().tolist()
+                
+                for track_id, (x1, y1, x2, y2), class_id, confidence in zip(track_ids, xyxy, class_ids, confidences):
                     tracks.append({
                         'track_id': track_id,
-                        'class_id': int(box.cls[0]),
-                        'class_name': result.names[int(box.cls[0])],
-                        'confidence': float(box.conf[0]),
-                        'bbox': {
-                            'x1': float(x1),
-                            'y1': float(y1),
-                            'x2': float(x2),
-                            'y2': float(y2)
-                        }
+                        'class_id': class_id,
+                        'class_name': result.names[class_id],
+                        'confidence': confidence,
+                        'bbox': {'x1': x1, 'y1': y1, 'x2': x2, 'y2': y2}
                     })
         
         return {
@@ -226,50 +278,8 @@ class YOLO11Vision:
         results = model(source, conf=conf, iou=iou, save=save, show=show)
         
         poses = []
-        # 关键点名称（COCO 格式）
-        keypoint_names = [
-            'nose', 'left_eye', 'right_eye', 'left_ear', 'right_ear',
-            'left_shoulder', 'right_shoulder', 'left_elbow', 'right_elbow',
-            'left_wrist', 'right_wrist', 'left_hip', 'right_hip',
-            'left_knee', 'right_knee', 'left_ankle', 'right_ankle'
-        ]
-        
         for result in results:
-            if result.keypoints is not None:
-                keypoints_data = result.keypoints
-                boxes = result.boxes
-                
-                for i in range(len(keypoints_data)):
-                    kpts = keypoints_data[i].xy[0].cpu().numpy()
-                    kpts_conf = keypoints_data[i].conf[0].cpu().numpy() if keypoints_data[i].conf is not None else None
-                    
-                    # 获取边界框
-                    bbox = None
-                    if boxes is not None and i < len(boxes):
-                        x1, y1, x2, y2 = boxes[i].xyxy[0].cpu().numpy()
-                        bbox = {
-                            'x1': float(x1),
-                            'y1': float(y1),
-                            'x2': float(x2),
-                            'y2': float(y2)
-                        }
-                    
-                    # 构建关键点信息
-                    keypoints = []
-                    for j, name in enumerate(keypoint_names):
-                        if j < len(kpts):
-                            keypoints.append({
-                                'name': name,
-                                'x': float(kpts[j][0]),
-                                'y': float(kpts[j][1]),
-                                'confidence': float(kpts_conf[j]) if kpts_conf is not None else 0.0
-                            })
-                    
-                    poses.append({
-                        'person_id': i,
-                        'bbox': bbox,
-                        'keypoints': keypoints
-                    })
+            poses.extend(self._parse_pose(result))
         
         return {
             'task': 'pose_estimation',
@@ -313,7 +323,8 @@ class YOLO11Vision:
         task: str,
         source_dir: str,
         output_dir: str = 'output',
-        conf: float = 0.25
+        conf: float = 0.25,
+        batch_size: int = 8
     ) -> List[dict]:
         """
         批量处理图像
@@ -323,6 +334,9 @@ class YOLO11Vision:
             source_dir: 源图像目录
             output_dir: 输出目录
             conf: 置信度阈值
+            batch_size: 每次送入模型的图像数量（上限 16，避免显存压力过大）。
+                只有尺寸相同的图像才会合并推理，保证与逐张推理的结果一致；
+                GIF 会被逐帧推理，始终单独处理
         
         Returns:
             所有处理结果列表
@@ -331,27 +345,68 @@ class YOLO11Vision:
         output_path = Path(output_dir)
         output_path.mkdir(parents=True, exist_ok=True)
         
-        # 支持的图像格式
+        # 支持的图像格式（GIF 会被 Ultralytics 当作视频逐帧推理）
         image_extensions = {'.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp'}
+        video_like_extensions = {'.gif'}
         images = [f for f in source_path.iterdir() if f.suffix.lower() in image_extensions]
         
-        all_results = []
-        for image_path in images:
-            print(f"处理: {image_path.name}")
-            
-            if task == 'detect':
-                result = self.detect_objects(str(image_path), conf=conf, save=True)
-            elif task == 'classify':
-                result = self.classify_image(str(image_path), conf=conf, save=True)
-            elif task == 'pose':
-                result = self.estimate_pose(str(image_path), conf=conf, save=True)
-            else:
-                raise ValueError(f"批量处理不支持任务: {task}")
-            
-            result['source'] = str(image_path)
-            all_results.append(result)
-        
-        return all_results
+        # 各任务的结果类型、解析函数和推理参数
+        if task == 'detect':
+            task_name, parse, kwargs = 'detection', self._parse_detection, {'iou': 0.45}
+        elif task == 'classify':
+            task_name, parse, kwargs = 'classification', lambda r: self._parse_classification(r, 5), {}
+        elif task == 'pose':
+            task_name, parse, kwargs = 'pose_estimation', self._parse_pose, {'iou': 0.45}
+        else:
+            raise ValueError(f"批量处理不支持任务: {task}")
+        
+        model = self.load_model(task)
+        batch_size = max(1, min(batch_size, 16))
+        
+        # 按尺寸分组：同尺寸的图像批量推理时 letterbox 方式与逐张推理相同
+        # GIF 和无法读取尺寸的文件单独推理
+        groups = {}
+        for index, image_path in enumerate(images):
+            size = None
+            if image_path.suffix.lower() not in video_like_extensions:
+                size = self._read_image_size(image_path)
+            groups.setdefault(size if size is not None else ('single', index), []).append(index)
+        
+        # 多张图像合并为一个批次推理，减少逐张调用的开销
+        parsed = [None] * len(images)
+        for indices in groups.values():
+            for start in range(0, len(indices), batch_size):
+                chunk = indices[start:start + batch_size]
+                for index in chunk:
+                    print(f"处理: {images[index].name}")
+                
+                if len(chunk) == 1:
+                    # 单个文件（可能是多帧 GIF）的所有结果都属于该文件
+                    results = model(str(images[chunk[0]]), conf=conf, save=True, **kwargs)
+                    parsed[chunk[0]] = [item for result in results for item in parse(result)]
+                else:
+                    sources = [str(images[index]) for index in chunk]
+                    results = model(sources, conf=conf, save=True, batch=len(chunk), **kwargs)
+                    for index, result in zip(chunk, results):
+                        parsed[index] = parse(result)
+        
+        return [
+            {
+                'task': task_name,
+                'results': results,
+                'source': str(image_path)
+            }
+            for image_path, results in zip(images, parsed)
+        ]
+    
+    @staticmethod
+    def _read_image_size(image_path: Path) -> Optional[tuple]:
+        """读取图像尺寸（只解析文件头，不解码像素），失败时返回 None"""
+        try:
+            with Image.open(image_path) as image:
+                return image.size
+        except Exception:
+            return None
 
 
 def main():
@@ -0,0 +1,67 @@
+"""
+解码图像缓存测试
+"""
+
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from api_server import DecodedImageCache
+
+
+def make_image(nbytes: int) -> np.ndarray:
+    """生成指定字节数的图像"""
+    return np.zeros((1, nbytes, 1), dtype=np.uint8)
+
+
+class DecodedImageCacheTest(unittest.TestCase):
+    """DecodedImageCache 测试"""
+
+    def test_evicts_least_recently_used_entry(self):
+        """超过条目上限时淘汰最久未访问的图像"""
+        cache = DecodedImageCache(max_entries=2, max_bytes=1024)
+        cache.put("a", make_image(10))
+        cache.put("b", make_image(10))
+        self.assertIsNotNone(cache.get("a"))  # 访问 a，使 b 成为最久未访问
+        cache.put("c", make_image(10))
+
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNotNone(cache.get("c"))
+
+    def test_evicts_until_within_byte_budget(self):
+        """总字节数超过预算时从最旧的条目开始淘汰"""
+        cache = DecodedImageCache(max_entries=16, max_bytes=100)
+        cache.put("a", make_image(40))
+        cache.put("b", make_image(40))
+        cache.put("c", make_image(70))
+
+        self.assertIsNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("c"))
+
+    def test_cached_image_is_read_only(self):
+        """放入缓存的图像变为只读"""
+        cache = DecodedImageCache(max_entries=2, max_bytes=1024)
+        image = make_image(10)
+        cache.put("a", image)
+
+        self.assertFalse(image.flags.writeable)
+        self.assertFalse(cache.get("a").flags.writeable)
+
+    def test_oversize_image_is_read_only_but_not_cached(self):
+        """超过字节预算的图像不缓存，但同样变为只读"""
+        cache = DecodedImageCache(max_entries=2, max_bytes=100)
+        image = make_image(200)
+        cache.put("a", image)
+
+        self.assertFalse(image.flags.writeable)
+        self.assertIsNone(cache.get("a"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+"""
+场景分析器测试
+"""
+
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from api_server import SceneAnalyzer
+
+
+def make_large_image() -> np.ndarray:
+    """生成固定的大尺寸测试图像（色块 + 噪声，1600x1200）"""
+    rng = np.random.default_rng(2024)
+    blocks = rng.integers(0, 256, size=(6, 8, 3), dtype=np.uint8)
+    image = np.kron(blocks, np.ones((200, 200, 1), dtype=np.uint8))
+    noise = rng.integers(-20, 21, size=image.shape)
+    return np.clip(image.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+
+
+class AnalyzeImageFeaturesTest(unittest.TestCase):
+    """analyze_image_features 测试"""
+
+    def test_large_image_features_match_full_resolution_values(self):
+        """大图的特征值必须与全分辨率计算结果一致（动漫判断阈值依赖这些数值）"""
+        features = SceneAnalyzer.analyze_image_features(make_large_image())
+
+        self.assertAlmostEqual(features["saturation"], 0.664467001633987, places=6)
+        self.assertAlmostEqual(features["color_variety"], 0.07777777777777778, places=6)
+        self.assertAlmostEqual(features["edge_ratio"], 0.0058135416666666665, places=6)
+        self.assertEqual(features["unique_colors"], 250)
+        self.assertAlmostEqual(features["brightness"], 0.7388580126633987, places=6)
+        self.assertFalse(features["is_anime_style"])
+
+    def test_extreme_aspect_ratio(self):
+        """极端宽高比的图像也能正常分析"""
+        image = np.full((6, 3000, 3), 128, dtype=np.uint8)
+        features = SceneAnalyzer.analyze_image_features(image)
+        self.assertEqual(features["edge_ratio"], 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,34 @@
+"""
+utils 工具函数测试
+"""
+
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils import resize_image
+
+
+class ResizeImageTest(unittest.TestCase):
+    """resize_image 测试"""
+
+    def test_extreme_aspect_ratio_keeps_at_least_one_pixel(self):
+        """极端宽高比的图像缩放后短边不能为 0"""
+        for shape in ((6, 3000, 3), (3000, 6, 3)):
+            image = np.zeros(shape, dtype=np.uint8)
+            resized = resize_image(image, max_size=256)
+            self.assertEqual(max(resized.shape[:2]), 256)
+            self.assertGreaterEqual(min(resized.shape[:2]), 1)
+
+    def test_small_image_unchanged(self):
+        """不超过最大尺寸的图像保持原样"""
+        image = np.zeros((100, 200, 3), dtype=np.uint8)
+        self.assertIs(resize_image(image, max_size=256), image)
+
+
+if __name__ == "__main__":
+    unittest.main()
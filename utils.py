@@ -19,6 +19,15 @@ COLORS = [
 ]
 
 
+# COCO 人体 17 个关键点名称（下标与骨架连接定义一致）
+KEYPOINT_NAMES = (
+    'nose', 'left_eye', 'right_eye', 'left_ear', 'right_ear',
+    'left_shoulder', 'right_shoulder', 'left_elbow', 'right_elbow',
+    'left_wrist', 'right_wrist', 'left_hip', 'right_hip',
+    'left_knee', 'right_knee', 'left_ankle', 'right_ankle'
+)
+
+
 # 姿态估计骨架连接定义
 SKELETON_CONNECTIONS = [
     (0, 1), (0, 2),     # 鼻子 -> 眼睛
@@ -78,8 +87,9 @@ def resize_image(
     if keep_aspect:
         scale = min(max_size / w, max_size / h)
         if scale < 1:
-            new_w = int(w * scale)
-            new_h = int(h * scale)
+            # 极端宽高比的图像短边可能被缩放到 0，至少保留 1 像素
+            new_w = max(1, int(w * scale))
+            new_h = max(1, int(h * scale))
             image = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_AREA)
     else:
         if w > max_size or h > max_size:
@@ -271,7 +281,8 @@ def create_video_writer(
     output_path: str,
     fps: float,
     frame_size: Tuple[int, int],
-    codec: str = 'mp4v'
+    codec: str = 'mp4v',
+    hw_accel: bool = True
 ) -> cv2.VideoWriter:
     """
     创建视频写入器
@@ -280,19 +291,29 @@ def create_video_writer(
         output_path: 输出路径
         fps: 帧率
         frame_size: 帧大小 (width, height)
-        codec: 编码器
+        codec: 编码器（硬件编码通常需要 'avc1' / 'hevc' 等 H.264/H.265 编码）
+        hw_accel: 是否优先使用硬件编码（不可用时回退到软件编码）
         
     Returns:
         VideoWriter 对象
     """
     fourcc = cv2.VideoWriter_fourcc(*codec)
+    if hw_accel:
+        writer = cv2.VideoWriter(
+            output_path, cv2.CAP_FFMPEG, fourcc, fps, frame_size,
+            [cv2.VIDEOWRITER_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY]
+        )
+        if writer.isOpened():
+            return writer
+        writer.release()
     return cv2.VideoWriter(output_path, fourcc, fps, frame_size)
 
 
 def process_video_frames(
     video_path: str,
     callback,
-    max_frames: Optional[int] = None
+    max_frames: Optional[int] = None,
+    hw_accel: bool = True
 ) -> List:
     """
     处理视频帧
@@ -301,11 +322,18 @@ def process_video_frames(
         video_path: 视频路径
         callback: 帧处理回调函数
         max_frames: 最大处理帧数
+        hw_accel: 是否优先使用硬件解码（不可用时自动回退到软件解码）
         
     Returns:
         所有帧的处理结果列表
     """
-    cap = cv2.VideoCapture(video_path)
+    if hw_accel:
+        cap = cv2.VideoCapture(
+            video_path, cv2.CAP_ANY,
+            [cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY]
+        )
+    else:
+        cap = cv2.VideoCapture(video_path)
     results = []
     frame_count = 0
     
@@ -198,11 +198,17 @@ def main():
                             output_dir = Path("runs") / task
                             output_dir.mkdir(parents=True, exist_ok=True)
                             
+                            # 视频帧按批送入模型（每批 8 帧），流式逐批取回结果并保存，
+                            # 不在内存中保留整段视频的结果
                             results = model(
                                 tfile.name,
                                 conf=conf_threshold,
-                                save=True
+                                save=True,
+                                batch=8,
+                                stream=True
                             )
+                            for _ in results:
+                                pass
                             
                             st.success("✅ 视频处理完成！")
                             st.info(f"结果保存在: {output_dir}")